@@ -1,17 +1,17 @@
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, status, Request
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from pathlib import Path
+import asyncio
+from concurrent.futures.process import BrokenProcessPool
+import io
 import os
-import uuid
 import re
 from typing import List
+from backend.core import decode_cache, tone_cache
 from backend.core.database import get_db
 from backend.core.config import get_settings
 from backend.core.rate_limit import limiter
-from backend.models.tone_table import ToneEntry
 from backend.models.schemas import ToneDetectionResult, ToneEntryResponse
-from backend.services.tone_detector import ToneDetector
+from backend.services.tone_detector import ToneDetector, create_detect_pool, detect_entry
 
 router = APIRouter(prefix="/api/decode", tags=["audio"])
 settings = get_settings()
@@ -19,6 +19,31 @@ settings = get_settings()
 # Whitelist of safe file extensions (no path traversal characters)
 SAFE_EXTENSIONS = {'.wav'}
 
+CHUNK_SIZE = 1024 * 1024  # 1MB chunks
+
+
+async def _run_detection(request: Request, detector: ToneDetector, contents: bytes):
+    """
+    Run detect_entry in the app's process pool.
+
+    If a worker has died (e.g. OOM-killed) the executor is permanently broken,
+    so it is replaced for later uploads. This upload is not resubmitted: it is
+    the likeliest cause, and retrying it would take down the new pool too.
+    """
+    loop = asyncio.get_running_loop()
+    pool = request.app.state.detect_pool
+    try:
+        return await loop.run_in_executor(pool, detect_entry, detector, contents)
+    except BrokenProcessPool:
+        # Only the first request to notice replaces the pool
+        if request.app.state.detect_pool is pool:
+            pool.shutdown(wait=False, cancel_futures=True)
+            request.app.state.detect_pool = create_detect_pool()
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Audio processing is temporarily unavailable. Please try again."
+        )
+
 
 @router.post("/", response_model=ToneDetectionResult)
 @limiter.limit("10/minute")  # Limit to 10 audio uploads per minute per IP
@@ -49,62 +74,39 @@ async def decode_audio(
             detail=f"Invalid file type. Only WAV files are allowed."
         )
 
-    # Validate file size
-    file.file.seek(0, 2)  # Seek to end
-    file_size = file.file.tell()
-    file.file.seek(0)  # Reset to beginning
-
+    # Validate file size (oversized bodies with a Content-Length are already
+    # rejected by MaxUploadSizeMiddleware before they are read)
     max_size = settings.max_file_size_mb * 1024 * 1024
-    if file_size > max_size:
+    if file.size is not None and file.size > max_size:
         raise HTTPException(
             status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
             detail=f"File too large. Max size: {settings.max_file_size_mb}MB"
         )
 
-    # Save uploaded file temporarily with secure filename
-    upload_dir = Path(settings.upload_dir)
-    upload_dir.mkdir(parents=True, exist_ok=True)
-
-    # Use only UUID for filename (no user input in path)
-    temp_filename = f"{uuid.uuid4()}.wav"
-    temp_path = upload_dir / temp_filename
-
-    # Verify the path is still within upload_dir (defense in depth)
-    if not temp_path.resolve().is_relative_to(upload_dir.resolve()):
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Invalid file path"
-        )
-
     try:
-        # Write file with size limit enforcement during read
-        bytes_written = 0
-        max_bytes = max_size
-
-        with open(temp_path, "wb") as f:
-            # Read in chunks to avoid loading entire file into memory
-            chunk_size = 1024 * 1024  # 1MB chunks
-            while True:
-                chunk = await file.read(chunk_size)
-                if not chunk:
-                    break
-
-                bytes_written += len(chunk)
-                if bytes_written > max_bytes:
-                    # Clean up partial file
-                    f.close()
-                    if temp_path.exists():
-                        os.remove(temp_path)
-                    raise HTTPException(
-                        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
-                        detail=f"File too large. Max size: {settings.max_file_size_mb}MB"
-                    )
-
-                f.write(chunk)
-
-        # Detect tones
-        detector = ToneDetector(tolerance_hz=settings.frequency_tolerance_hz)
-        tone1_hz, tone2_hz, confidence = detector.detect_two_tone_sequence(str(temp_path))
+        # Read in chunks with size limit enforcement; the upload never touches our disk
+        buffer = io.BytesIO()
+        hasher = decode_cache.new_hasher()
+        bytes_read = 0
+
+        while chunk := await file.read(CHUNK_SIZE):
+            bytes_read += len(chunk)
+            if bytes_read > max_size:
+                raise HTTPException(
+                    status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                    detail=f"File too large. Max size: {settings.max_file_size_mb}MB"
+                )
+
+            buffer.write(chunk)
+            hasher.update(chunk)
+
+        # Detect tones in the process pool; decoding and analysis are CPU-bound.
+        # Re-uploads of the same recording reuse the earlier detection result.
+        detector = request.app.state.detector
+        tone1_hz, tone2_hz, confidence = await decode_cache.get_or_detect(
+            (hasher.intdigest(), bytes_read),
+            lambda: _run_detection(request, detector, buffer.getvalue())
+        )
 
         if tone1_hz is None or tone2_hz is None:
             return ToneDetectionResult(
@@ -115,19 +117,15 @@ async def decode_audio(
                 message="No two-tone sequence detected in audio file"
             )
 
-        # Fetch all tone entries from database
-        result = await db.execute(select(ToneEntry))
-        entries = result.scalars().all()
-
-        # Convert to format expected by detector
-        tone_list = [(e.id, e.label, e.tone1_hz, e.tone2_hz) for e in entries]
+        # Fetch the cached tone table
+        ids, labels, freqs, by_id = await tone_cache.get_entries_array(db)
 
         # Find matching entry
-        matched = detector.find_matching_tone(tone1_hz, tone2_hz, tone_list)
+        matched_idx = detector.find_matching_tone(tone1_hz, tone2_hz, freqs)
 
-        if matched:
-            entry_id, label, _, _ = matched
-            matched_entry_obj = next(e for e in entries if e.id == entry_id)
+        if matched_idx is not None:
+            label = labels[matched_idx]
+            matched_entry_obj = by_id[int(ids[matched_idx])]
             matched_entry = ToneEntryResponse.model_validate(matched_entry_obj)
             message = f"Match found: {label}"
         else:
@@ -142,6 +140,8 @@ async def decode_audio(
             message=message
         )
 
+    except HTTPException:
+        raise
     except ValueError as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -154,11 +154,3 @@ async def decode_audio(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Error processing audio file. Please ensure it is a valid WAV file."
         )
-    finally:
-        # Clean up temporary file
-        try:
-            if temp_path.exists():
-                os.remove(temp_path)
-        except Exception:
-            # Log but don't fail if cleanup fails
-            pass
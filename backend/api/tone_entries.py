@@ -2,6 +2,7 @@ from fastapi import APIRouter, Depends, HTTPException, status, Request
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, delete
 from typing import List
+from backend.core import tone_cache
 from backend.core.database import get_db
 from backend.core.rate_limit import limiter
 from backend.models.tone_table import ToneEntry
@@ -29,10 +30,11 @@ async def list_tone_entries(
     if limit > 1000:  # Cap maximum results
         limit = 1000
 
+    # Select plain rows; the response model reads them by attribute without ORM hydration
     result = await db.execute(
-        select(ToneEntry).offset(skip).limit(limit)
+        select(ToneEntry.__table__).offset(skip).limit(limit)
     )
-    entries = result.scalars().all()
+    entries = result.all()
     return entries
 
 
@@ -72,6 +74,7 @@ async def create_tone_entry(
 
     db.add(db_entry)
     await db.commit()
+    tone_cache.invalidate()
     await db.refresh(db_entry)
 
     return db_entry
@@ -100,6 +103,7 @@ async def update_tone_entry(
     db_entry.tone2_hz = entry.tone2_hz
 
     await db.commit()
+    tone_cache.invalidate()
     await db.refresh(db_entry)
 
     return db_entry
@@ -124,4 +128,5 @@ async def delete_tone_entry(
         )
 
     await db.commit()
+    tone_cache.invalidate()
     return None
@@ -8,6 +8,9 @@ class Settings(BaseSettings):
     max_file_size_mb: int = 50
     allowed_extensions: str = ".wav"
     frequency_tolerance_hz: float = 2.0
+    tone_cache_ttl_seconds: float = 5.0
+    # Detection processes per uvicorn worker; total is this times --workers
+    detect_pool_workers: int = 1
 
     # Audio processing parameters
     sample_rate: int = 44100
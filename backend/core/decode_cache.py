@@ -0,0 +1,67 @@
+import asyncio
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+import xxhash
+from cachetools import LRUCache
+
+# (tone1_hz, tone2_hz, confidence) as returned by ToneDetector
+DetectionResult = Tuple[Optional[float], Optional[float], float]
+
+# Cache key: (xxh3_64 digest, length) of the uploaded bytes
+DecodeKey = Tuple[int, int]
+
+# Detection depends only on the audio, not on the tone table, so cached
+# results stay valid across tone entry writes; matching is redone per request.
+_results: LRUCache = LRUCache(maxsize=256)
+_inflight: Dict[DecodeKey, asyncio.Future] = {}
+
+# Shared-future result telling waiters that the owning request was cancelled
+_OWNER_CANCELLED = object()
+
+
+def new_hasher() -> xxhash.xxh3_64:
+    """Return a hasher to feed upload chunks into while they are read."""
+    return xxhash.xxh3_64()
+
+
+async def get_or_detect(
+    key: DecodeKey,
+    detect: Callable[[], Awaitable[DetectionResult]]
+) -> DetectionResult:
+    """
+    Return the cached detection result for key, running detect() on a miss.
+
+    Concurrent requests for the same key share a single detect() call. If
+    the request running it is cancelled, a waiting request runs its own.
+    """
+    while True:
+        cached = _results.get(key)
+        if cached is not None:
+            return cached
+
+        pending = _inflight.get(key)
+        if pending is None:
+            break
+
+        result = await asyncio.shield(pending)
+        if result is not _OWNER_CANCELLED:
+            return result
+        # The request running detect() was cancelled; retry with our own detect()
+
+    future = asyncio.get_running_loop().create_future()
+    _inflight[key] = future
+    try:
+        result = await detect()
+    except asyncio.CancelledError:
+        # Don't cancel the waiters too; wake them so one of them takes over
+        future.set_result(_OWNER_CANCELLED)
+        raise
+    except Exception as e:
+        future.set_exception(e)
+        future.exception()  # Mark retrieved when nobody else is waiting
+        raise
+    else:
+        _results[key] = result
+        future.set_result(result)
+        return result
+    finally:
+        del _inflight[key]
@@ -0,0 +1,68 @@
+import asyncio
+import time
+import numpy as np
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from backend.core.config import get_settings
+from backend.models.tone_table import ToneEntry
+
+settings = get_settings()
+
+# In-memory snapshot of the tone table used for matching uploads.
+# Each server process keeps its own copy; writes in this process invalidate it
+# immediately, and the TTL bounds staleness when several workers are running.
+_lock = asyncio.Lock()
+TableSnapshot = Tuple[np.ndarray, List[str], np.ndarray, Dict[int, Any]]
+
+_entries: Optional[TableSnapshot] = None
+_loaded_at = 0.0
+_generation = 0
+
+
+async def get_entries_array(db: AsyncSession) -> TableSnapshot:
+    """
+    Return the cached tone table, loading it from the database if needed.
+
+    Returns:
+        (ids, labels, freqs, by_id) where ids is an int64 array of shape (N,),
+        labels is a list of N strings, freqs is a float32 array of shape
+        (N, 2) holding (tone1_hz, tone2_hz) per entry and by_id maps each id
+        to its full row.
+    """
+    global _entries, _loaded_at
+
+    if _entries is not None and time.monotonic() - _loaded_at < settings.tone_cache_ttl_seconds:
+        return _entries
+
+    async with _lock:
+        if _entries is not None and time.monotonic() - _loaded_at < settings.tone_cache_ttl_seconds:
+            return _entries
+
+        generation = _generation
+        # Plain rows rather than ORM instances; nothing here needs identity tracking
+        result = await db.execute(select(ToneEntry.__table__))
+        rows = result.all()
+
+        snapshot = (
+            np.array([row.id for row in rows], dtype=np.int64),
+            [row.label for row in rows],
+            np.array(
+                [(row.tone1_hz, row.tone2_hz) for row in rows], dtype=np.float32
+            ).reshape(-1, 2),
+            {row.id: row for row in rows},
+        )
+
+        # Don't publish a snapshot if a write invalidated the cache mid-query
+        if generation == _generation:
+            _entries = snapshot
+            _loaded_at = time.monotonic()
+
+        return snapshot
+
+
+def invalidate() -> None:
+    """Drop the cached tone table after the tone_entries table changes."""
+    global _entries, _generation
+    _entries = None
+    _generation += 1
@@ -0,0 +1,32 @@
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+# Allowance for multipart boundaries and part headers around the uploaded file
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+
+class MaxUploadSizeMiddleware:
+    """
+    Reject oversized request bodies by Content-Length before any body is read.
+
+    Runs at the ASGI layer because FastAPI parses form bodies (spooling the
+    upload) before endpoint dependencies are resolved. Bodies without a
+    Content-Length are still capped by the streamed check in the endpoint.
+    """
+
+    def __init__(self, app: ASGIApp, path_prefix: str, max_bytes: int, detail: str):
+        self.app = app
+        self.path_prefix = path_prefix
+        self.max_bytes = max_bytes
+        self.detail = detail
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http" and scope["path"].startswith(self.path_prefix):
+            content_length = Headers(scope=scope).get("content-length")
+            if content_length and content_length.isdigit() and int(content_length) > self.max_bytes:
+                response = JSONResponse(status_code=413, content={"detail": self.detail})
+                await response(scope, receive, send)
+                return
+
+        await self.app(scope, receive, send)
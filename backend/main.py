@@ -1,31 +1,51 @@
 from fastapi import FastAPI, Request
+from fastapi.responses import ORJSONResponse
 from contextlib import asynccontextmanager
 from slowapi import _rate_limit_exceeded_handler
 from slowapi.errors import RateLimitExceeded
+from core.config import get_settings
 from core.database import init_db
 from core.rate_limit import limiter
+from core.upload_limit import MaxUploadSizeMiddleware, MULTIPART_OVERHEAD_BYTES
+from backend.services.tone_detector import ToneDetector, create_detect_pool
 from api import tone_entries, audio_upload
 
+settings = get_settings()
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup: Initialize database
     await init_db()
+    # One long-lived detector shared by all requests
+    app.state.detector = ToneDetector(tolerance_hz=settings.frequency_tolerance_hz)
+    # Tone detection is CPU-bound; run it in worker processes to sidestep the GIL
+    app.state.detect_pool = create_detect_pool()
     yield
-    # Shutdown: cleanup if needed
+    # Shutdown: stop detection workers
+    app.state.detect_pool.shutdown(cancel_futures=True)
 
 
 app = FastAPI(
     title="Dual-Tone Decoder",
     description="Web-based tool for decoding two-tone sequential paging signals",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
 # Add rate limiting
 app.state.limiter = limiter
 app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
 
+# Reject oversized uploads from their Content-Length before the body is spooled
+app.add_middleware(
+    MaxUploadSizeMiddleware,
+    path_prefix=audio_upload.router.prefix,
+    max_bytes=settings.max_file_size_mb * 1024 * 1024 + MULTIPART_OVERHEAD_BYTES,
+    detail=f"File too large. Max size: {settings.max_file_size_mb}MB"
+)
+
 # Include API routers
 app.include_router(tone_entries.router)
 app.include_router(audio_upload.router)
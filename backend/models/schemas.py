@@ -3,6 +3,8 @@ from datetime import datetime
 from typing import Optional
 import re
 
+_HTML_TAG_RE = re.compile(r'<[^>]*>')
+
 
 class ToneEntryBase(BaseModel):
     label: str = Field(..., min_length=1, max_length=255)
@@ -14,9 +16,10 @@ class ToneEntryBase(BaseModel):
     def sanitize_label(cls, v: str) -> str:
         """Sanitize label to prevent XSS and ensure printable characters."""
         # Remove any HTML/script tags
-        v = re.sub(r'<[^>]*>', '', v)
-        # Remove non-printable characters except spaces
-        v = ''.join(char for char in v if char.isprintable() or char.isspace())
+        v = _HTML_TAG_RE.sub('', v)
+        # Remove non-printable characters except spaces (most labels are already clean)
+        if not v.isprintable():
+            v = ''.join(char for char in v if char.isprintable() or char.isspace())
         # Strip leading/trailing whitespace
         v = v.strip()
         if len(v) < 1:
@@ -1,10 +1,13 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime
+from sqlalchemy import Column, Integer, String, Float, DateTime, Index
 from sqlalchemy.sql import func
 from backend.core.database import Base
 
 
 class ToneEntry(Base):
     __tablename__ = "tone_entries"
+    __table_args__ = (
+        Index("ix_tone_entries_tones", "tone1_hz", "tone2_hz"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     label = Column(String, nullable=False, index=True)
@@ -1,51 +1,132 @@
 import numpy as np
-from scipy import signal
+from scipy import fft, ndimage
 from scipy.io import wavfile
 import librosa
-from typing import Tuple, Optional, List
+import soundfile
+from numba import njit
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+import io
+import multiprocessing
+import threading
+from typing import BinaryIO, Tuple, Optional, List
 from backend.core.config import get_settings
 
+try:
+    import pyfftw
+    import pyfftw.builders
+except ImportError:  # Optional dependency; fall back to scipy's FFT
+    pyfftw = None
+
 settings = get_settings()
 
+# FFTW plans own their input/output buffers, so executions are serialized
+_fftw_lock = threading.Lock()
+# Largest FFT planned with FFTW; longer segments use scipy so the buffers held
+# by cached plans stay bounded
+_MAX_FFTW_NFFT = 1 << 20
+
+
+@njit(cache=True, fastmath=True)
+def _goertzel_batch_kernel(samples: np.ndarray, coeffs: np.ndarray, n: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Run one Goertzel recurrence per coefficient and return the (q1, q2) states."""
+    k = coeffs.shape[0]
+    q1 = np.zeros(k)
+    q2 = np.zeros(k)
+    for j in range(k):
+        coeff = coeffs[j]
+        s1 = 0.0
+        s2 = 0.0
+        for i in range(n):
+            s0 = coeff * s1 - s2 + samples[i]
+            s2 = s1
+            s1 = s0
+        q1[j] = s1
+        q2[j] = s2
+    return q1, q2
+
+
+@lru_cache(maxsize=4)
+def _get_plan(nfft: int, dtype: type) -> "pyfftw.FFTW":
+    """Build (once per size) an FFTW_ESTIMATE real-input FFT plan."""
+    return pyfftw.builders.rfft(
+        pyfftw.empty_aligned(nfft, dtype=dtype),
+        n=nfft,
+        planner_effort='FFTW_ESTIMATE',
+        auto_align_input=True
+    )
+
+
+def _rfft(samples: np.ndarray, nfft: int) -> np.ndarray:
+    """Zero-padded real FFT using a cached FFTW plan when pyfftw is installed."""
+    if pyfftw is None or nfft > _MAX_FFTW_NFFT:
+        return fft.rfft(samples, n=nfft)
+
+    plan = _get_plan(nfft, np.float32)
+    with _fftw_lock:
+        plan.input_array[:len(samples)] = samples
+        plan.input_array[len(samples):] = 0
+        return plan().copy()
+
+
+def load_wav_buffer(buffer: BinaryIO) -> Tuple[np.ndarray, int]:
+    """
+    Decode WAV data from a file-like object into mono float32 samples.
+
+    Returns:
+        (samples, sample_rate) tuple
+    """
+    try:
+        samples, sample_rate = soundfile.read(buffer, dtype='float32', always_2d=False)
+    except Exception as e:
+        raise ValueError(f"Failed to load audio file: {str(e)}")
+
+    # Downmix multi-channel audio
+    if samples.ndim > 1:
+        samples = samples.mean(axis=1)
+
+    return samples, sample_rate
+
 
 class ToneDetector:
     """
     Detects two-tone sequential paging signals in audio files.
-    Uses Goertzel algorithm for efficient single-frequency detection.
+    Uses a zero-padded FFT for the band sweep and the Goertzel algorithm
+    to refine peaks at the edge of the band.
     """
 
     def __init__(self, tolerance_hz: float = None):
         self.tolerance_hz = tolerance_hz or settings.frequency_tolerance_hz
 
-    def goertzel(self, samples: np.ndarray, sample_rate: int, target_freq: float) -> float:
+    def goertzel_batch(
+        self,
+        samples: np.ndarray,
+        sample_rate: int,
+        target_freqs: np.ndarray
+    ) -> np.ndarray:
         """
-        Goertzel algorithm for detecting a specific frequency.
-        More efficient than FFT for single frequency detection.
+        Goertzel algorithm evaluated for several frequencies in one pass.
 
-        Returns the magnitude of the target frequency.
+        Returns the magnitude of each target frequency.
         """
         n = len(samples)
-        k = int(0.5 + (n * target_freq / sample_rate))
-        omega = (2.0 * np.pi * k) / n
+        # Goertzel is exact at any omega, so evaluate the requested frequencies
+        # directly rather than rounding them to a DFT bin
+        omega = 2.0 * np.pi * np.asarray(target_freqs, dtype=np.float64) / sample_rate
 
         cos_omega = np.cos(omega)
         sin_omega = np.sin(omega)
-        coeff = 2.0 * cos_omega
+        coeffs = 2.0 * cos_omega
 
-        q0 = 0.0
-        q1 = 0.0
-        q2 = 0.0
-
-        for sample in samples:
-            q0 = coeff * q1 - q2 + sample
-            q2 = q1
-            q1 = q0
+        q1, q2 = _goertzel_batch_kernel(
+            np.ascontiguousarray(samples, dtype=np.float32), coeffs, n
+        )
 
         real = q1 - q2 * cos_omega
         imag = q2 * sin_omega
-        magnitude = np.sqrt(real * real + imag * imag)
+        magnitudes = np.sqrt(real * real + imag * imag)
 
-        return magnitude / n
+        return magnitudes / n
 
     def detect_tone_in_window(
         self,
@@ -60,15 +141,19 @@ class ToneDetector:
         Returns:
             (frequency, confidence) tuple
         """
-        # Generate candidate frequencies
+        # Zero-pad so bin spacing is at least as fine as the requested resolution;
+        # power-of-two sizes keep the number of distinct FFT plans small
+        min_nfft = max(int(sample_rate / resolution_hz), len(samples))
+        nfft = 1 << (min_nfft - 1).bit_length()
+        # float32 input yields a complex64 spectrum
+        spectrum = _rfft(np.asarray(samples, dtype=np.float32), nfft)
+        freqs = fft.rfftfreq(nfft, 1.0 / sample_rate)
+
+        # Keep only the bins inside the band of interest
         min_freq, max_freq = freq_range
-        test_frequencies = np.arange(min_freq, max_freq, resolution_hz)
-
-        # Test each frequency using Goertzel
-        magnitudes = np.array([
-            self.goertzel(samples, sample_rate, freq)
-            for freq in test_frequencies
-        ])
+        lo, hi = np.searchsorted(freqs, [min_freq, max_freq])
+        test_frequencies = freqs[lo:hi]
+        magnitudes = np.abs(spectrum[lo:hi]) / len(samples)
 
         # Find peak
         peak_idx = np.argmax(magnitudes)
@@ -84,14 +169,21 @@ class ToneDetector:
         else:
             confidence = 0.0
 
-        # Refine frequency estimate around peak
-        if peak_idx > 0 and peak_idx < len(magnitudes) - 1:
-            refined_freq = self._refine_frequency(
-                samples, sample_rate, peak_freq, resolution_hz / 2
-            )
-            return refined_freq, confidence
-
-        return peak_freq, confidence
+        # Refine frequency estimate with a parabola through the peak and its neighbours
+        bin_hz = sample_rate / nfft
+        if 0 < peak_idx < len(magnitudes) - 1:
+            m_prev, m_peak, m_next = magnitudes[peak_idx - 1:peak_idx + 2]
+            denom = m_prev - 2 * m_peak + m_next
+            if denom != 0:
+                delta = 0.5 * (m_prev - m_next) / denom
+                return peak_freq + delta * bin_hz, confidence
+            return peak_freq, confidence
+
+        # Peak at the band edge has no neighbour on one side; refine with Goertzel
+        refined_freq = self._refine_frequency(
+            samples, sample_rate, peak_freq, bin_hz / 2
+        )
+        return refined_freq, confidence
 
     def _refine_frequency(
         self,
@@ -100,12 +192,10 @@ class ToneDetector:
         center_freq: float,
         step: float
     ) -> float:
-        """Refine frequency estimate around a peak."""
-        test_freqs = np.arange(center_freq - step * 2, center_freq + step * 2, step / 4)
-        magnitudes = np.array([
-            self.goertzel(samples, sample_rate, freq)
-            for freq in test_freqs
-        ])
+        """Refine frequency estimate around a peak at the edge of the sweep band."""
+        # 17 points spaced step / 4, symmetric about the peak bin
+        test_freqs = np.linspace(center_freq - step * 2, center_freq + step * 2, 17)
+        magnitudes = self.goertzel_batch(samples, sample_rate, test_freqs)
         peak_idx = np.argmax(magnitudes)
         return test_freqs[peak_idx]
 
@@ -125,18 +215,38 @@ class ToneDetector:
         except Exception as e:
             raise ValueError(f"Failed to load audio file: {str(e)}")
 
-        # Normalize samples
-        samples = samples / np.max(np.abs(samples))
+        return self.detect_two_tone_sequence_from_array(samples, sample_rate)
+
+    def detect_two_tone_sequence_from_array(
+        self,
+        samples: np.ndarray,
+        sample_rate: int
+    ) -> Tuple[Optional[float], Optional[float], float]:
+        """
+        Detects two sequential tones in already decoded mono samples.
+
+        Returns:
+            (tone1_hz, tone2_hz, overall_confidence) tuple
+        """
+        # Too short to hold two 100ms tones
+        if len(samples) < int(0.2 * sample_rate):
+            return None, None, 0.0
+
+        # Normalize samples, keeping everything downstream in float32
+        samples = np.asarray(samples, dtype=np.float32)
+        peak = np.max(np.abs(samples))
+        if peak > 0:
+            samples = samples / peak
 
         # Calculate energy envelope to find tone boundaries
         frame_length = int(sample_rate * 0.01)  # 10ms frames
-        energy = np.array([
-            np.sum(samples[i:i+frame_length]**2)
-            for i in range(0, len(samples) - frame_length, frame_length)
-        ])
+        n_frames = len(samples) // frame_length
+        frames = samples[:n_frames * frame_length].reshape(n_frames, frame_length)
+        energy = np.empty(n_frames, dtype=np.float32)
+        np.einsum('ij,ij->i', frames, frames, out=energy)
 
         # Smooth energy
-        energy_smooth = signal.medfilt(energy, kernel_size=5)
+        energy_smooth = ndimage.median_filter(energy, size=5, mode='nearest')
 
         # Find threshold for tone presence
         threshold = np.mean(energy_smooth) + 2 * np.std(energy_smooth)
@@ -176,30 +286,19 @@ class ToneDetector:
 
         Returns list of (start_sample, end_sample) tuples.
         """
-        segments = []
-        in_tone = False
-        start_idx = 0
-
         min_tone_frames = int(0.1 * sample_rate / frame_length)  # Min 100ms
 
-        for i, active in enumerate(tone_active):
-            if active and not in_tone:
-                start_idx = i
-                in_tone = True
-            elif not active and in_tone:
-                if i - start_idx >= min_tone_frames:
-                    segments.append((
-                        start_idx * frame_length,
-                        i * frame_length
-                    ))
-                in_tone = False
-
-        # Handle case where tone extends to end
-        if in_tone and len(tone_active) - start_idx >= min_tone_frames:
-            segments.append((
-                start_idx * frame_length,
-                len(tone_active) * frame_length
-            ))
+        # Pad with inactive frames so tones touching either end still produce an edge
+        padded = np.concatenate(([False], tone_active, [False]))
+        edges = np.diff(padded.astype(np.int8))
+        starts = np.flatnonzero(edges == 1)
+        ends = np.flatnonzero(edges == -1)
+
+        keep = (ends - starts) >= min_tone_frames
+        segments = [
+            (int(start) * frame_length, int(end) * frame_length)
+            for start, end in zip(starts[keep], ends[keep])
+        ]
 
         return segments
 
@@ -207,27 +306,54 @@ class ToneDetector:
         self,
         detected_tone1: float,
         detected_tone2: float,
-        tone_entries: List[Tuple[int, str, float, float]]
-    ) -> Optional[Tuple[int, str, float, float]]:
+        tone_freqs: np.ndarray
+    ) -> Optional[int]:
         """
         Find matching tone entry from database.
 
         Args:
             detected_tone1: First detected frequency in Hz
             detected_tone2: Second detected frequency in Hz
-            tone_entries: List of (id, label, tone1_hz, tone2_hz) tuples
+            tone_freqs: (N, 2) array of (tone1_hz, tone2_hz) rows
 
         Returns:
-            Matching entry tuple or None
+            Row index of the first matching entry or None
         """
-        for entry in tone_entries:
-            entry_id, label, tone1_hz, tone2_hz = entry
+        if len(tone_freqs) == 0:
+            return None
 
-            # Check if both tones match within tolerance
-            tone1_match = abs(detected_tone1 - tone1_hz) <= self.tolerance_hz
-            tone2_match = abs(detected_tone2 - tone2_hz) <= self.tolerance_hz
+        # Check if both tones match within tolerance for every row at once
+        detected = np.array([detected_tone1, detected_tone2], dtype=np.float32)
+        match = np.all(np.abs(tone_freqs - detected) <= self.tolerance_hz, axis=1)
 
-            if tone1_match and tone2_match:
-                return entry
+        idx = int(np.argmax(match))
+        if match[idx]:
+            return idx
 
         return None
+
+
+def detect_entry(
+    detector: ToneDetector,
+    contents: bytes
+) -> Tuple[Optional[float], Optional[float], float]:
+    """
+    Decode a WAV upload and run two-tone detection on it.
+
+    Entry point for the detection process pool; it lives here so workers only
+    import the detector, not the API layer.
+    """
+    samples, sample_rate = load_wav_buffer(io.BytesIO(contents))
+    return detector.detect_two_tone_sequence_from_array(samples, sample_rate)
+
+
+def create_detect_pool() -> ProcessPoolExecutor:
+    """
+    Create the process pool that runs detect_entry.
+
+    Uses spawn (not fork) so workers don't inherit the event loop's threads.
+    """
+    return ProcessPoolExecutor(
+        max_workers=settings.detect_pool_workers,
+        mp_context=multiprocessing.get_context("spawn")
+    )